@@ -1,4 +1,4 @@
-from .gitupdt import check_remote_updates, has_remote_updates, get_appropriate_install_command
+from .gitupdt import check_remote_updates, has_remote_updates, get_appropriate_install_command, RepoState
 
 
-__all__ = ['check_remote_updates', 'has_remote_updates', 'get_appropriate_install_command']
+__all__ = ['check_remote_updates', 'has_remote_updates', 'get_appropriate_install_command', 'RepoState']
@@ -1,30 +1,270 @@
 import os
+import re
 import sys
-import difflib
-import subprocess
+import functools
 import argparse
 import shutil
-import tomllib
-import git
-from git import InvalidGitRepositoryError
-from questionary import Choice, Separator, select
-from packaging import version
-
-def get_sorted_tags(repo):
-    """有効なバージョンタグを取得し、新しい順にソートして返す"""
-    assert version is not None
-    all_tags = [t.name for t in repo.tags]
+
+# git / questionary / packaging / subprocess などは読み込みに時間がかかるため、
+# --help などで起動時間が延びないよう使用する関数内でimportする
+
+@functools.lru_cache(maxsize=None)
+def _release_tag_re():
+    """
+    バージョンとして解釈できるタグ名に一致する正規表現を返す。
+    packagingと同じパターンを使うため、version.parse が受け付けるタグはすべて一致する。
+    """
+    from packaging.version import VERSION_PATTERN
+
+    return re.compile(r'^\s*' + VERSION_PATTERN + r'\s*$', re.VERBOSE | re.IGNORECASE)
+
+
+def _parse_version_tags(tag_names):
+    """タグ名のうちバージョンとして解釈できるものを、(タグ名, Version) のリストとして新しい順に返す"""
+    from packaging import version
+
+    # 一致しないタグ (docsのビルドやCI用のタグなど) は version.parse を呼ばずに除外する
+    release_tag_re = _release_tag_re()
     valid_tags = []
-    for tag in all_tags:
+    for tag in tag_names:
+        if not release_tag_re.match(tag):
+            continue
         try:
-            v = version.parse(tag)
-            valid_tags.append((tag, v))
+            valid_tags.append((tag, version.parse(tag)))
         except version.InvalidVersion:
             pass
-    
+
     # バージョンオブジェクトでソート (降順)
+    # gitのversionsortは 1.0rc1 や 1.0.post1 をPEP 440と異なる順に並べるため使わない
     valid_tags.sort(key=lambda x: x[1], reverse=True)
-    return [t[0] for t in valid_tags]
+    return valid_tags
+
+
+def get_tag_version(sorted_tags, tag_name):
+    """
+    (タグ名, Version) のリストから解析済みのVersionを取得する。
+    リストに含まれないタグの場合のみ解析する (解析できない場合はInvalidVersionを送出する)
+    """
+    tag_version = dict(sorted_tags).get(tag_name)
+    if tag_version is None:
+        from packaging import version
+        tag_version = version.parse(tag_name)
+    return tag_version
+
+
+def count_behind(repo, base, target):
+    """baseから見てtargetが何コミット進んでいるかを返す。参照が存在しない場合は0"""
+    from git import GitCommandError
+
+    try:
+        return int(repo.git.rev_list('--count', f'{base}..{target}'))
+    except GitCommandError:
+        return 0
+
+
+def _get_default_branch(repo):
+    """originのデフォルトブランチ名を返す。特定できない場合はNone"""
+    from git import GitCommandError
+
+    try:
+        # refs/remotes/origin/HEAD はローカルに保存されているのでネットワーク通信は不要
+        return repo.git.symbolic_ref('refs/remotes/origin/HEAD', short=True).removeprefix('origin/')
+    except GitCommandError:
+        pass
+    # origin/HEAD が無い場合のみリモートに問い合わせる
+    # git remote show origin はリモートの全ブランチを調べるため、HEADのみを問い合わせる
+    # (git remote show -n origin はHEAD branchを取得できない)
+    ls_output = repo.git.ls_remote("--symref", "origin", "HEAD")
+    for line in ls_output.splitlines():
+        if line.startswith("ref: refs/heads/"):
+            return line.split("\t")[0].removeprefix("ref: refs/heads/")
+    return None
+
+
+class _RepoSnapshot:
+    """git for-each-ref を1回実行して取得したブランチ・リモートブランチ・タグの一覧"""
+    __slots__ = ('branches', 'remotes', 'tags', 'head_branch', 'tracking_branch', 'default_branch')
+
+    def __init__(self):
+        self.branches = {} # ブランチ名 -> コミットのSHA
+        self.remotes = {} # リモートブランチ名 (例: origin/main) -> コミットのSHA
+        self.tags = {} # タグ名 -> タグが指すコミットのSHA
+        self.head_branch = None
+        self.tracking_branch = None
+        self.default_branch = None
+
+
+# 参照名, SHA, 注釈付きタグが指すSHA, HEADかどうか, 追跡ブランチ, シンボリック参照の対象 (タブ区切り)
+_SNAPSHOT_FORMAT = '%09'.join([
+    '%(refname)', '%(objectname)', '%(*objectname)', '%(HEAD)', '%(upstream:short)', '%(symref)',
+])
+
+
+def _snapshot_refs(repo):
+    """ブランチ・リモートブランチ・タグの情報を git for-each-ref 1回でまとめて取得する"""
+    output = repo.git.for_each_ref(
+        f'--format={_SNAPSHOT_FORMAT}', 'refs/heads/', 'refs/remotes/', 'refs/tags/'
+    )
+    snapshot = _RepoSnapshot()
+    for line in output.splitlines():
+        fields = line.split('\t')
+        if len(fields) < 6:
+            fields += [''] * (6 - len(fields))
+        refname, sha, peeled_sha, head, upstream, symref = fields[:6]
+        if refname.startswith('refs/tags/'):
+            # 注釈付きタグの場合はタグが指すコミットのSHAを使う
+            snapshot.tags[refname.removeprefix('refs/tags/')] = peeled_sha or sha
+        elif refname.startswith('refs/remotes/'):
+            name = refname.removeprefix('refs/remotes/')
+            if symref:
+                # refs/remotes/origin/HEAD はoriginのデフォルトブランチを指している
+                if name == 'origin/HEAD':
+                    snapshot.default_branch = symref.removeprefix('refs/remotes/origin/')
+                continue
+            snapshot.remotes[name] = sha
+        elif refname.startswith('refs/heads/'):
+            name = refname.removeprefix('refs/heads/')
+            snapshot.branches[name] = sha
+            if head == '*':
+                snapshot.head_branch = name
+                snapshot.tracking_branch = upstream or None
+    return snapshot
+
+
+class RepoState:
+    """
+    has_remote_updates と check_remote_updates の間で共有するリポジトリの状態。
+    両方に同じインスタンスを渡すと、fetchや参照の取得が1回で済む。
+    状態は作成後に更新されないため、時間をおいて確認する場合は新しく作成すること。
+    """
+    __slots__ = (
+        'fetched', 'default_branch', 'default_branch_loaded',
+        'sorted_tags', 'current_tags', 'behind_counts', 'snapshot',
+    )
+
+    def __init__(self):
+        self.fetched = False
+        self.default_branch = None
+        self.default_branch_loaded = False
+        self.sorted_tags = None
+        self.current_tags = None
+        self.behind_counts = {} # リモートブランチの先端のSHA -> 遅れているコミット数
+        self.snapshot = None
+
+    def fetch(self, repo):
+        """まだfetchしていなければoriginからタグを含めてfetchする"""
+        if not self.fetched:
+            repo.remotes.origin.fetch(tags=True)
+            self.fetched = True
+
+    def get_snapshot(self, repo):
+        """fetch後の参照の一覧を返す (git for-each-ref は1回だけ実行する)"""
+        if self.snapshot is None:
+            self.snapshot = _snapshot_refs(repo)
+        return self.snapshot
+
+    def get_default_branch(self, repo):
+        if not self.default_branch_loaded:
+            self.default_branch = self.get_snapshot(repo).default_branch or _get_default_branch(repo)
+            self.default_branch_loaded = True
+        return self.default_branch
+
+    def get_sorted_tags(self, repo):
+        if self.sorted_tags is None:
+            self.sorted_tags = _parse_version_tags(self.get_snapshot(repo).tags)
+        return self.sorted_tags
+
+    def get_behind(self, repo, ref):
+        """
+        HEADから見てref (例: origin/main) が何コミット進んでいるかを返す。
+        必要になったブランチだけを数え、同じコミットは1回しか数えない。
+        """
+        snapshot = self.get_snapshot(repo)
+        # 追跡ブランチがローカルブランチの場合も考慮する
+        tip_sha = snapshot.remotes.get(ref) or snapshot.branches.get(ref)
+        if tip_sha is None or tip_sha == repo.head.commit.hexsha:
+            # 参照が存在しない、またはHEADと同じコミットなので数える必要はない
+            return 0
+        if tip_sha not in self.behind_counts:
+            self.behind_counts[tip_sha] = count_behind(repo, 'HEAD', tip_sha)
+        return self.behind_counts[tip_sha]
+
+    def get_current_tags(self, repo):
+        """HEADのコミットを指しているタグ名のリストを名前順に返す"""
+        if self.current_tags is None:
+            head_sha = repo.head.commit.hexsha
+            self.current_tags = [
+                name for name, sha in self.get_snapshot(repo).tags.items() if sha == head_sha
+            ]
+        return self.current_tags
+
+
+@functools.lru_cache(maxsize=None)
+def _uv_installed():
+    """uvコマンドがインストールされているかを返す (PATHの探索は初回のみ)"""
+    return shutil.which('uv') is not None
+
+
+_VENV_DIR_NAMES = ('.venv', 'venv')
+
+
+def _venv_python_path(venv_path):
+    """venvフォルダ内のPythonのパスを返す"""
+    # Windowsの場合はScripts/python.exe、Unix系はbin/python
+    if os.name == 'nt':
+        return os.path.join(venv_path, 'Scripts', 'python.exe')
+    return os.path.join(venv_path, 'bin', 'python')
+
+
+def find_venv_python(repo_path):
+    """
+    repo_pathから上の階層に向かって .venv / venv フォルダを探し、venvのPythonのパスを返す。
+
+    Args:
+        repo_path: 探索を開始するパス
+
+    Returns:
+        見つかったvenvのPythonのパス、見つからない場合はNone
+    """
+    search_path = os.path.abspath(repo_path)
+
+    # venvで実行中の場合、そのvenvがある階層に到達した時点で探索を終える
+    # (それより近い階層にあるvenvが優先されるように、探索自体は省略しない)
+    active_parent = None
+    active_python = None
+    active_venv = os.environ.get('VIRTUAL_ENV')
+    if not active_venv and sys.prefix != sys.base_prefix:
+        active_venv = sys.prefix
+    if active_venv:
+        active_venv = os.path.abspath(active_venv)
+        if os.path.basename(active_venv) in _VENV_DIR_NAMES:
+            python_exe = _venv_python_path(active_venv)
+            if os.path.isfile(python_exe):
+                active_parent = os.path.normcase(os.path.dirname(active_venv))
+                active_python = python_exe
+
+    while True:
+        if active_python and os.path.normcase(search_path) == active_parent:
+            return active_python
+
+        # 階層ごとにscandirを1回だけ行い、ディレクトリ判定にはエントリのキャッシュを使う
+        try:
+            with os.scandir(search_path) as entries:
+                found = {e.name for e in entries if e.name in _VENV_DIR_NAMES and e.is_dir()}
+        except OSError:
+            found = set()
+
+        for venv_name in _VENV_DIR_NAMES:
+            if venv_name in found:
+                python_exe = _venv_python_path(os.path.join(search_path, venv_name))
+                if os.path.isfile(python_exe):
+                    return python_exe
+
+        # 階層をひとつ上がる
+        parent_path = os.path.dirname(search_path)
+        if parent_path == search_path:  # ルートディレクトリに到達
+            return None
+        search_path = parent_path
 
 
 def get_appropriate_install_command(repo_path):
@@ -39,39 +279,16 @@ def get_appropriate_install_command(repo_path):
         選択されたインストールコマンドの辞書、またはキャンセル時は空文字
         辞書の形式: {'type': 'uv'|'python', 'command': str, 'description': str}
     """
+    from questionary import Choice, Separator, select
+
     # uvコマンドがインストールされているか確認
-    uv_installed = shutil.which('uv') is not None
+    uv_installed = _uv_installed()
 
     # 現在実行されているPythonのパスを取得
     current_python = sys.executable
 
     # venvフォルダを探す
-    venv_python = None
-    search_path = os.path.abspath(repo_path)
-
-    while search_path:
-        for venv_name in ['.venv', 'venv']:
-            venv_path = os.path.join(search_path, venv_name)
-            if os.path.isdir(venv_path):
-                # venvのフォルダかどうかを確認
-                # Windowsの場合はScripts/python.exe、Unix系はbin/python
-                if os.name == 'nt':  # Windows
-                    python_exe = os.path.join(venv_path, 'Scripts', 'python.exe')
-                else:  # Unix系
-                    python_exe = os.path.join(venv_path, 'bin', 'python')
-
-                if os.path.isfile(python_exe):
-                    venv_python = python_exe
-                    break
-
-        if venv_python:
-            break
-
-        # 階層をひとつ上がる
-        parent_path = os.path.dirname(search_path)
-        if parent_path == search_path:  # ルートディレクトリに到達
-            break
-        search_path = parent_path
+    venv_python = find_venv_python(repo_path)
 
     # 選択肢の作成
     choices = []
@@ -135,6 +352,8 @@ def install_requirements(repo, requirements_path):
         repo: Gitリポジトリオブジェクト
         requirements_path: requirements.txtのパス
     """
+    import subprocess
+
     install_cmd = get_appropriate_install_command(repo.working_tree_dir)
     if install_cmd:
         print(f"Installing requirements using: {install_cmd['description']}")
@@ -175,6 +394,9 @@ def install_requirements_uv(repo):
     Returns:
         str: 選択されたアクション ("sync", "requirements", または None)
     """
+    import subprocess
+    from questionary import Choice, Separator, select
+
     choices = [
         Choice(title="uv sync", value="sync"),
         Choice(title="use requirements.txt in next task", value="requirements"),
@@ -197,6 +419,148 @@ def install_requirements_uv(repo):
     return None  # キャンセル
 
 
+class _PyprojectSnapshot:
+    """
+    ある時点のpyproject.tomlの内容を保持する。
+    dependenciesは初めて参照された時に解析し、結果を再利用する。
+    """
+    __slots__ = ('path', '_bytes', '_deps')
+
+    _UNPARSED = object()
+
+    def __init__(self, path):
+        self.path = path
+        self._deps = self._UNPARSED
+        try:
+            with open(path, 'rb') as f:
+                self._bytes = f.read()
+        except OSError:
+            self._bytes = None # ファイルが読めなくても処理は続行
+
+    @property
+    def data(self):
+        """ファイルの内容 (読めなかった場合はNone)"""
+        return self._bytes
+
+    @property
+    def deps(self):
+        """dependenciesのリスト (読めない、または解析できない場合はNone)"""
+        if self._deps is self._UNPARSED:
+            self._deps = None
+            if self._bytes is not None:
+                try:
+                    import tomllib
+                    data = tomllib.loads(self._bytes.decode('utf-8'))
+                    self._deps = data.get('project', {}).get('dependencies', [])
+                except Exception:
+                    pass
+        return self._deps
+
+
+def snapshot_file(path, previous=None):
+    """
+    ファイルの状態を (stat情報, ハッシュ値, 内容のバイト列) のタプルとして返す。
+    ファイルが存在しない、または読めない場合は空のファイルとして扱う。
+
+    Args:
+        path: ファイルのパス
+        previous: 以前に取得したスナップショット。サイズと更新日時が同じ場合は読み込まずにこれを返す
+
+    Returns:
+        tuple: ((サイズ, 更新日時), blake2bのダイジェスト, 内容のバイト列)
+    """
+    import hashlib
+
+    try:
+        st = os.stat(path)
+        stat_key = (st.st_size, st.st_mtime_ns)
+        if previous is not None and previous[0] == stat_key:
+            return previous
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        stat_key = None
+        data = b''
+    return stat_key, hashlib.blake2b(data, digest_size=16).digest(), data
+
+
+def _decode_lines(data):
+    """バイト列をテキストモードで読み込んだ場合と同じように行のリストに変換する"""
+    import io
+
+    return io.StringIO(data.decode('utf-8', errors='replace'), newline=None).readlines()
+
+
+def should_run_gc(repo):
+    """
+    git gc --auto が実際にgcを行う可能性があるかを、gitと同じ方法で見積もる。
+    gitプロセスを起動せずに判定するため、objectsフォルダのエントリ数のみを数える。
+
+    Args:
+        repo: Gitリポジトリオブジェクト
+
+    Returns:
+        bool: git gc --auto を実行するべき場合はTrue
+    """
+    try:
+        config = repo.config_reader()
+        gc_auto = int(config.get_value('gc', 'auto', 6700))
+        pack_limit = int(config.get_value('gc', 'autoPackLimit', 50))
+        if gc_auto <= 0:
+            return False # gc.auto = 0 の場合、git gc --auto は何もしない
+
+        objects_dir = os.path.join(repo.common_dir, 'objects')
+
+        # gitと同様に objects/17 の緩いオブジェクト数から全体の数を推定する
+        threshold = (gc_auto + 255) // 256
+        loose_count = _count_dir_entries(os.path.join(objects_dir, '17'), lambda name: len(name) == 38)
+        if loose_count > threshold:
+            return True
+
+        if pack_limit > 0:
+            pack_count = _count_dir_entries(os.path.join(objects_dir, 'pack'), lambda name: name.endswith('.pack'))
+            if pack_count > pack_limit:
+                return True
+        return False
+    except Exception:
+        return True # 判定できない場合は従来どおりgitに任せる
+
+
+def _count_dir_entries(path, match):
+    """フォルダ内で名前がmatchに一致するエントリの数を返す。フォルダが無い場合は0"""
+    try:
+        with os.scandir(path) as entries:
+            return sum(1 for e in entries if match(e.name))
+    except FileNotFoundError:
+        return 0
+
+
+# 差分をまとめて書き込む際のバッファの上限
+_DIFF_BUFFER_LIMIT = 1024 * 1024
+
+
+def write_diff(diff):
+    """
+    unified_diffの出力を結合して標準出力に書き込む。
+    大きな差分でメモリを使いすぎないよう、上限を超えた分は分割して書き込む。
+
+    Args:
+        diff: difflib.unified_diff が返す行のイテレータ
+    """
+    chunks = []
+    size = 0
+    for line in diff:
+        chunks.append(line)
+        size += len(line)
+        if size >= _DIFF_BUFFER_LIMIT:
+            sys.stdout.write(''.join(chunks))
+            chunks.clear()
+            size = 0
+    if chunks:
+        sys.stdout.write(''.join(chunks))
+    sys.stdout.flush()
+
+
 def perform_update(repo, selection, reset=False):
     """
     選択されたアクションを実行する
@@ -206,6 +570,8 @@ def perform_update(repo, selection, reset=False):
         selection: ユーザーが選択したアクションを含む辞書
         reset: Trueの場合、git reset --hardを使用する
     """
+    import difflib
+
     if not selection:
         print("Cancelled.")
         return
@@ -214,31 +580,19 @@ def perform_update(repo, selection, reset=False):
     target = selection.get('target')
 
     # --- pyproject.toml の変更を追跡する処理 ---
-    before_deps = None
+    # 解析はGit操作の後に内容が変わっていた場合のみ行う
+    before_pyproject = None
     pyproject_path = os.path.join(repo.working_tree_dir, 'pyproject.toml')
-    uv_installed = shutil.which('uv') is not None
+    uv_installed = _uv_installed()
     if uv_installed and os.path.isfile(pyproject_path):
-        try:
-            with open(pyproject_path, 'rb') as f:
-                data = tomllib.load(f)
-                # dependenciesセクションを取得
-                deps = data.get('project', {}).get('dependencies', [])
-                # ソートして比較用に文字列化
-                before_deps = sorted(deps)
-        except Exception:
-            pass # ファイルが読めなくても処理は続行
+        before_pyproject = _PyprojectSnapshot(pyproject_path)
 
     # --- requirements.txt の変更を追跡する処理 ---
-    before_reqs = []
     reqs_path = os.path.join(repo.working_tree_dir, 'requirements.txt')
-    if os.path.exists(reqs_path):
-        try:
-            with open(reqs_path, 'r', encoding='utf-8') as f:
-                before_reqs = f.readlines()
-        except IOError:
-            pass # ファイルが読めなくても処理は続行
+    before_reqs = snapshot_file(reqs_path)
 
     # --- Git操作の実行 ---
+    pre_sha = repo.head.commit.hexsha
     if action == 'checkout':
         print(f"Checking out tag '{target}'...")
         if reset:
@@ -251,60 +605,72 @@ def perform_update(repo, selection, reset=False):
             except Exception:
                 # リモートブランチが存在しない場合はtargetそのものにreset
                 repo.git.reset('--hard', target)
-            print(f"Done: Reset to {target}.")
+            done_message = f"Done: Reset to {target}."
         else:
             repo.git.checkout(target)
-            print(f"Done: Switched to {target}.")
+            done_message = f"Done: Switched to {target}."
     elif action == 'pull':
         print(f"Pulling branch '{target}'...")
         if reset:
             repo.git.fetch()
             repo.git.reset('--hard', f'origin/{target}')
-            print("Done: Reset to the latest remote state.")
+            done_message = "Done: Reset to the latest remote state."
         else:
             repo.git.pull()
-            print("Done: Updated to the latest state.")
+            done_message = "Done: Updated to the latest state."
     elif action == 'checkout_pull':
         print(f"Checking out and pulling branch '{target}'...")
         repo.git.checkout(target)
         if reset:
             repo.git.reset('--hard', f'origin/{target}')
-            print(f"Done: Reset {target} to the latest remote state.")
+            done_message = f"Done: Reset {target} to the latest remote state."
         else:
             repo.git.pull()
-            print(f"Done: Updated {target} to the latest state.")
+            done_message = f"Done: Updated {target} to the latest state."
     else:
         return # 未知のアクションやキャンセル
 
+    # HEADが移動していなければ依存関係のファイルも変わっていないので以降の処理は不要
+    # (resetの場合はHEADが同じでもローカルのファイルが復元されている可能性がある)
+    head_unchanged = not reset and repo.head.commit.hexsha == pre_sha
+    if head_unchanged and action != 'checkout':
+        # pullで新しいコミットが無かった場合は更新したとは表示しない
+        print("Already up to date.")
+    else:
+        print(done_message)
+    if head_unchanged:
+        return
+
     # --- リポジトリのメンテナンス ---
-    print("\nPerforming repository maintenance...")
-    repo.git.gc('--auto')
+    if should_run_gc(repo):
+        print("\nPerforming repository maintenance...")
+        repo.git.gc('--auto')
 
     # --- pyproject.toml の変更を表示 ---
     pyproject_changed = False
-    if before_deps is not None:
-        after_deps = None
-        try:
-            with open(pyproject_path, 'rb') as f:
-                data = tomllib.load(f)
-                deps = data.get('project', {}).get('dependencies', [])
-                after_deps = sorted(deps)
-        except Exception:
-            pass # ファイルが読めなくても比較は行う
-
-        if after_deps is not None and before_deps != after_deps:
+    after_pyproject = None
+    if before_pyproject is not None and before_pyproject.data is not None:
+        after_pyproject = _PyprojectSnapshot(pyproject_path)
+
+    # ファイルの内容が同じであれば解析しない
+    if (after_pyproject is not None and after_pyproject.data is not None
+            and after_pyproject.data != before_pyproject.data
+            and before_pyproject.deps is not None and after_pyproject.deps is not None):
+        before_set = set(before_pyproject.deps)
+        after_set = set(after_pyproject.deps)
+        if before_set != after_set:
             pyproject_changed = True
             print("\n--- Changes in pyproject.toml (dependencies) ---")
-            before_lines = [f"{dep}\n" for dep in before_deps]
-            after_lines = [f"{dep}\n" for dep in after_deps]
+            # 追加・削除された依存関係のみを差分として表示する
+            before_lines = [f"{dep}\n" for dep in sorted(before_set - after_set)]
+            after_lines = [f"{dep}\n" for dep in sorted(after_set - before_set)]
             diff = difflib.unified_diff(
                 before_lines,
                 after_lines,
                 fromfile='before pyproject.toml',
                 tofile='after pyproject.toml',
             )
-            for line in diff:
-                print(line, end='')
+            write_diff(diff)
             print("------------------------------------")
             print("\nWould you like to run uv sync to update dependencies?")
             result = install_requirements_uv(repo)
@@ -312,32 +678,27 @@ def perform_update(repo, selection, reset=False):
                 return
 
     # --- requirements.txt の変更を表示 ---
-    after_reqs = []
-    if os.path.exists(reqs_path):
-        try:
-            with open(reqs_path, 'r', encoding='utf-8') as f:
-                after_reqs = f.readlines()
-        except IOError:
-            pass # ファイルが読めなくても比較は行う
-    
-    if before_reqs != after_reqs:
+    after_reqs = snapshot_file(reqs_path, before_reqs)
+
+    # ハッシュ値が同じであれば行単位の比較は行わない
+    if before_reqs[1] != after_reqs[1]:
         print("\n--- Changes in requirements.txt ---")
         diff = difflib.unified_diff(
-            before_reqs,
-            after_reqs,
+            _decode_lines(before_reqs[2]),
+            _decode_lines(after_reqs[2]),
             fromfile='before requirements.txt',
             tofile='after requirements.txt',
         )
-        for line in diff:
-            print(line, end='')
+        write_diff(diff)
         print("------------------------------------")
         print("\nWould you like to install the updated requirements.txt?")
         print("Please select the Python path suitable for your venv environment.")
         install_requirements(repo, reqs_path)
 
-def has_remote_updates(repo_path="."):
+def has_remote_updates(repo_path=".", state=None):
     """
     リモートリポジトリに更新があるかどうかを確認し、(更新有無, 詳細情報) のタプルを返す。
+    state に RepoState を渡すと、取得した情報を check_remote_updates で再利用できる。
     
     戻り値: (bool, dict)
     辞書は以下のキーを含む:
@@ -347,6 +708,10 @@ def has_remote_updates(repo_path="."):
     - message: 人間が読める形式のメッセージ (例: "v1.0.0 -> v1.1.0")
     - behind_count: 遅れているコミット数 (ブランチの場合)
     """
+    import git
+    from git import InvalidGitRepositoryError
+    from packaging import version
+
     # Gitリポジトリかどうかを事前にチェック
     try:
         repo = git.Repo(repo_path)
@@ -355,29 +720,31 @@ def has_remote_updates(repo_path="."):
     except Exception:
         return False, {}
 
+    if state is None:
+        state = RepoState()
+
     try:
-        origin = repo.remotes.origin
-        origin.fetch(tags=True)
+        state.fetch(repo)
 
         # 1. ブランチの更新チェック
         if not repo.head.is_detached:
             active_branch = repo.active_branch
-            tracking_branch = active_branch.tracking_branch()
+            # 遅れているコミット数と同じキーを使うため、追跡ブランチはスナップショットから取得する
+            tracking_branch = state.get_snapshot(repo).tracking_branch
             if tracking_branch:
-                behind = sum(1 for c in repo.iter_commits(f'{active_branch.name}..{tracking_branch.name}'))
+                behind = state.get_behind(repo, tracking_branch)
                 if behind > 0:
                     return True, {
                         'type': 'branch',
                         'current': active_branch.name,
-                        'latest': tracking_branch.name,
+                        'latest': tracking_branch,
                         'behind_count': behind,
                         'message': f"{behind} commits behind"
                     }
 
         # 2. タグの更新チェック
-        current_tags_str = repo.git.tag(points_at=repo.head.commit.hexsha)
-        current_tags = current_tags_str.split('\n') if current_tags_str else []
-        
+        current_tags = state.get_current_tags(repo)
+
         current_tag_name = None
         if current_tags:
             if not repo.head.is_detached and repo.active_branch.name in current_tags:
@@ -385,12 +752,12 @@ def has_remote_updates(repo_path="."):
             else:
                 current_tag_name = current_tags[0]
 
-        sorted_tags = get_sorted_tags(repo)
-        latest_tag = sorted_tags[0] if sorted_tags else None
+        sorted_tags = state.get_sorted_tags(repo)
+        latest_tag, latest_version = sorted_tags[0] if sorted_tags else (None, None)
 
         if latest_tag and current_tag_name:
             try:
-                if version.parse(latest_tag) > version.parse(current_tag_name):
+                if latest_version > get_tag_version(sorted_tags, current_tag_name):
                     return True, {
                         'type': 'tag',
                         'current': current_tag_name,
@@ -401,18 +768,11 @@ def has_remote_updates(repo_path="."):
                 pass
 
         # 3. デフォルトブランチの更新チェック
-        # git remote show origin の出力から HEAD branch を探す
-        show_output = repo.git.remote("show", "origin")
-        default_branch = None
-        for line in show_output.splitlines():
-            if "HEAD branch:" in line:
-                default_branch = line.split("HEAD branch:")[1].strip()
-                break
-        
+        default_branch = state.get_default_branch(repo)
         if default_branch:
             remote_ref = f"origin/{default_branch}"
             try:
-                behind = sum(1 for c in repo.iter_commits(f'HEAD..{remote_ref}'))
+                behind = state.get_behind(repo, remote_ref)
                 if behind > 0:
                     return True, {
                         'type': 'default_branch',
@@ -429,14 +789,19 @@ def has_remote_updates(repo_path="."):
     except Exception:
         return False, {}
 
-def check_remote_updates(repo_path=".", reset=False):
+def check_remote_updates(repo_path=".", reset=False, state=None):
     """
     リモートの更新を確認し、ユーザーに選択肢を提示する
 
     Args:
         repo_path: Gitリポジトリのパス
         reset: Trueの場合、git reset --hardを使用する
+        state: has_remote_updates に渡したRepoState。省略時はリモートから取得し直す
     """
+    import git
+    from git import InvalidGitRepositoryError
+    from packaging import version
+    from questionary import Choice, Separator, select
 
     # Gitリポジトリかどうかを事前にチェック
     try:
@@ -448,6 +813,9 @@ def check_remote_updates(repo_path=".", reset=False):
         print(f"Error: Failed to access Git repository at '{repo_path}': {e}")
         return
 
+    if state is None:
+        state = RepoState()
+
     try:
         origin = repo.remotes.origin
 
@@ -455,20 +823,19 @@ def check_remote_updates(repo_path=".", reset=False):
         print(f"Remote URL: {remote_url}")
         if reset:
             print("Reset mode is enabled.")
-        print("Fetching latest info from remote (origin)...")
-        origin.fetch(tags=True)
+        if not state.fetched:
+            print("Fetching latest info from remote (origin)...")
+            state.fetch(repo)
         
         # 現在のコミットに紐づくタグを取得
-        # repo.tagsの参照が不完全な場合を考慮し、gitコマンドを直接実行してタグを取得する
-        current_tags_str = repo.git.tag(points_at=repo.head.commit.hexsha)
-        current_tags = current_tags_str.split('\n') if current_tags_str else []
+        current_tags = state.get_current_tags(repo)
 
         # ブランチ情報の取得
         active_branch = None
         tracking_branch = None
         if not repo.head.is_detached:
             active_branch = repo.active_branch
-            tracking_branch = active_branch.tracking_branch()
+            tracking_branch = state.get_snapshot(repo).tracking_branch
 
         current_tag_name = None
         if current_tags:
@@ -482,13 +849,8 @@ def check_remote_updates(repo_path=".", reset=False):
         choices = []
 
         # リモートのデフォルトブランチを特定して、最新を取得する選択肢を追加
-        default_branch = None
         try:
-            show_output = repo.git.remote("show", "origin")
-            for line in show_output.splitlines():
-                if "HEAD branch:" in line:
-                    default_branch = line.split("HEAD branch:")[1].strip()
-                    break
+            default_branch = state.get_default_branch(repo)
             if default_branch:
                 # 現在のブランチがデフォルトブランチと同じ場合は表示しない
                 if not active_branch or active_branch.name != default_branch:
@@ -499,12 +861,12 @@ def check_remote_updates(repo_path=".", reset=False):
         except Exception:
             pass
 
-        sorted_tags = get_sorted_tags(repo)
-        latest_tag = sorted_tags[0] if sorted_tags else None
+        sorted_tags = state.get_sorted_tags(repo)
+        latest_tag, latest_version = sorted_tags[0] if sorted_tags else (None, None)
 
         # 1. ブランチの更新 (Pull)
         if active_branch and tracking_branch:
-            behind = sum(1 for c in repo.iter_commits(f'{active_branch.name}..{tracking_branch.name}'))
+            behind = state.get_behind(repo, tracking_branch)
             if behind > 0 or reset:
                 title = f"★ Pull {active_branch.name}"
                 if behind > 0:
@@ -521,7 +883,7 @@ def check_remote_updates(repo_path=".", reset=False):
             is_newer = False
             if current_tag_name:
                 try:
-                    if version.parse(latest_tag) > version.parse(current_tag_name):
+                    if latest_version > get_tag_version(sorted_tags, current_tag_name):
                         is_newer = True
                 except version.InvalidVersion:
                     pass
@@ -534,7 +896,7 @@ def check_remote_updates(repo_path=".", reset=False):
             ))
 
         # 3. その他のタグ (最大10個)
-        for tag in sorted_tags[:10]:
+        for tag, _ in sorted_tags[:10]:
             if tag == latest_tag: continue
             choices.append(Choice(title=tag, value={'action': 'checkout', 'target': tag}))
 